@@ -1,29 +1,261 @@
 # /// script
 # requires-python = ">=3.10"
 # dependencies = [
-#     "anyio",
 #     "fire",
 #     "notebook",
+#     "orjson",
 #     "pydantic",
 #     "rich",
 # ]
 # ///
+import os
 import ast
 import shutil
 from typing import Literal
 import asyncio
 from pathlib import Path
-from functools import cached_property
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
-import anyio
 import nbformat
-from pydantic import Field, BaseModel, ConfigDict, computed_field
+from pydantic import Field, BaseModel, ConfigDict, PrivateAttr
 from nbconvert import MarkdownExporter
+import nbformat.v4
 from rich.console import Console
 from rich.progress import TaskID, Progress
 from nbconvert.preprocessors import ExecutePreprocessor
 
+try:
+    import orjson
+
+    _HAS_ORJSON = True
+except ImportError:
+    _HAS_ORJSON = False
+
 console = Console()
+_exporters = threading.local()
+_MIN_FILES_FOR_POOL = 16
+# ast.parse reads about 6 MB/s per core while a spawned worker needs about a second to
+# import this script, so two or more workers only win back their startup past a few MB
+_MIN_BYTES_FOR_POOL = 8 * 1024 * 1024
+
+
+def _is_dunder_all(node: ast.expr) -> bool:
+    return isinstance(node, ast.Name) and node.id == "__all__"
+
+
+def _mutates_dunder_all(node: ast.AST) -> bool:
+    if isinstance(node, ast.AugAssign):
+        return _is_dunder_all(node.target)
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Attribute)
+        and _is_dunder_all(node.value.func.value)
+        and node.value.func.attr in {"extend", "append"}
+    )
+
+
+def _literal_names(value: ast.expr | None) -> set[str] | None:
+    """Evaluate an ``__all__`` value, only a literal list or tuple of strings is accepted."""
+    if value is None:
+        return None
+    try:
+        names = ast.literal_eval(value)
+    except (ValueError, TypeError):
+        return None
+    if isinstance(names, (list, tuple)) and all(isinstance(name, str) for name in names):
+        return set(names)
+    return None
+
+
+def _exported_names(tree: ast.Module) -> set[str] | None:
+    """Read the literal ``__all__`` of a module.
+
+    Args:
+        tree (ast.Module): The parsed module.
+
+    Returns:
+        set[str] | None: The exported names, or None when ``__all__`` is missing, not a literal
+            or modified after its assignment (``+=``, ``.extend`` or ``.append``).
+    """
+    exported: set[str] | None = None
+    for node in ast.iter_child_nodes(tree):
+        if _mutates_dunder_all(node):
+            return None
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign):
+            targets = [node.target]
+        else:
+            continue
+        if any(_is_dunder_all(target) for target in targets):
+            exported = _literal_names(node.value)
+    return exported
+
+
+def _extract_classnames(contents: bytes, filename: str) -> list[str]:
+    """Parse a python source and return its module level public class names.
+
+    This lives at module level so it can be pickled into a process pool, where parsing
+    runs outside the GIL of the event loop. When the module declares a literal ``__all__``
+    only the classes it exports are returned.
+
+    Args:
+        contents (bytes): The raw python source.
+        filename (str): The filename used in syntax error messages.
+
+    Returns:
+        list[str]: The names of the public classes defined at module level.
+    """
+    tree = ast.parse(source=contents, filename=filename)
+    # Only module level statements matter, nested classes render with their owner
+    classes = [
+        node.name
+        for node in ast.iter_child_nodes(tree)
+        if isinstance(node, ast.ClassDef) and not node.name.startswith("_")
+    ]
+    exported = _exported_names(tree)
+    if exported is not None:
+        classes = [name for name in classes if name in exported]
+    return classes
+
+
+def _module_path(file: Path) -> str:
+    """Build the dotted identifier of a python file for a mkdocstrings note.
+
+    Args:
+        file (Path): The python file.
+
+    Returns:
+        str: The path parts without the suffix joined by dots, the root of an absolute path
+            is dropped.
+    """
+    parts = file.with_suffix("").parts
+    if file.anchor:
+        parts = parts[1:]
+    return ".".join(parts)
+
+
+def _available_cpus() -> int:
+    """Count the CPUs this process may run on, honouring affinity masks where supported.
+
+    Returns:
+        int: The number of usable CPUs.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # sched_getaffinity is not available on macOS and Windows
+        return os.cpu_count() or 4
+
+
+def _use_process_pool(files: list[Path]) -> bool:
+    """Decide whether parsing the given python files is worth a process pool.
+
+    Args:
+        files (list[Path]): The python files to parse.
+
+    Returns:
+        bool: True when several CPUs are usable and the sources are large enough.
+    """
+    if _available_cpus() < 2 or len(files) < _MIN_FILES_FOR_POOL:
+        return False
+    return sum(file.stat().st_size for file in files) >= _MIN_BYTES_FOR_POOL
+
+
+def _parallel_rmtree(root: Path) -> None:
+    """Remove a folder tree, deleting its top level sub folders concurrently.
+
+    Args:
+        root (Path): The folder to remove.
+    """
+    # scandir would follow a symlinked root and empty its target, shutil.rmtree refuses it
+    if root.is_symlink():
+        shutil.rmtree(root)
+        return
+    folders: list[str] = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                folders.append(entry.path)
+            else:
+                os.unlink(entry.path)
+    # unlink releases the GIL, so the sub trees are removed in parallel
+    with ThreadPoolExecutor(max_workers=_available_cpus() * 2) as executor:
+        list(executor.map(shutil.rmtree, folders))
+    os.rmdir(root)
+
+
+def _read_notebook(contents: bytes) -> nbformat.NotebookNode:
+    """Load a notebook, decoding it with orjson when it is installed.
+
+    The orjson path skips the pure python json decoder and the schema validation done by
+    ``nbformat.reads``; anything it cannot handle falls back to ``nbformat.reads``.
+
+    Args:
+        contents (bytes): The raw notebook file.
+
+    Returns:
+        nbformat.NotebookNode: The notebook in nbformat version 4.
+    """
+    if _HAS_ORJSON:
+        try:
+            notebook = orjson.loads(contents)
+        except orjson.JSONDecodeError:
+            notebook = None
+        if isinstance(notebook, dict) and notebook.get("nbformat") == 4:
+            return nbformat.v4.to_notebook_json(notebook)
+    return nbformat.reads(contents.decode("utf-8"), as_version=4)
+
+
+def _markdown_exporter() -> MarkdownExporter:
+    """Return the markdown exporter of the current thread, its templates load once per worker.
+
+    Returns:
+        MarkdownExporter: The exporter using the markdown template.
+    """
+    markdown_exporter = getattr(_exporters, "markdown", None)
+    if markdown_exporter is None:
+        markdown_exporter = MarkdownExporter(template_name="markdown")
+        if not isinstance(markdown_exporter, MarkdownExporter):
+            raise TypeError("TemplateExporter is not a valid type")
+        _exporters.markdown = markdown_exporter
+    return markdown_exporter
+
+
+def _notebook_pipeline(file: Path, docs_path: Path, execute: bool) -> None:
+    """Convert a notebook into markdown synchronously, meant to run on a worker thread.
+
+    Args:
+        file (Path): The notebook to convert.
+        docs_path (Path): The markdown file to write.
+        execute (bool): Whether to execute the notebook before converting it.
+    """
+    # 讀取 notebook 檔案
+    notebook_content = _read_notebook(file.read_bytes())
+
+    if execute:
+        # 執行 notebook 中的所有 code block
+        execute_preprocessor = ExecutePreprocessor(
+            timeout=600,
+            kernel_name="python3",
+            allow_errors=True,
+            store_widget_state=True,
+            record_timing=True,
+        )
+        if not isinstance(execute_preprocessor, ExecutePreprocessor):
+            raise TypeError("ExecutePreprocessor is not a valid type")
+        execute_preprocessor.preprocess(
+            notebook_content, {"metadata": {"path": file.parent.as_posix()}}
+        )
+
+    # 使用執行後的 notebook 內容轉換為 markdown
+    markdown_output, _ = _markdown_exporter().from_notebook_node(notebook_content)
+    # 寫入轉換後的 markdown 內容到檔案
+    docs_path.write_text(data=markdown_output, encoding="utf-8")
 
 
 class DocsGenerator(BaseModel):
@@ -90,120 +322,157 @@ class DocsGenerator(BaseModel):
     )
     concurrency: int = Field(
         default=10,
+        ge=1,
         title="Concurrency Limit",
-        description="Maximum number of files to process concurrently.",
+        description="Maximum number of files to process concurrently, derived from the available CPUs when not given.",
         examples=[5, 10, 20],
     )
+    use_fd: bool = Field(
+        default=False,
+        title="Use fd",
+        description="Discover source files with the `fd` binary when it is installed, it also skips files ignored by git.",
+        examples=["True", "False"],
+    )
+    _pool: ProcessPoolExecutor | None = PrivateAttr(default=None)
+    _nb_pool: ThreadPoolExecutor | None = PrivateAttr(default=None)
+    _source_files_cache: list[Path] | None = PrivateAttr(default=None)
+    _processed: int = PrivateAttr(default=0)
 
-    def _get_all_files(self, suffix: str) -> list[Path]:
-        targets = [s.strip() for s in suffix.split(",")]
+    def _get_all_files(self, suffix: str, exclude: frozenset[str]) -> list[Path]:
+        targets = frozenset(f".{s.strip()}" for s in suffix.split(","))
         all_files: list[Path] = []
-        for target in targets:
-            filename = list(self.source_path.rglob(f"*.{target}"))
-            all_files.extend(filename)
+        # A single walk for every suffix, pruning excluded folders before descending into them,
+        # DirEntry already knows its type so no extra stat is needed per entry
+        folders = [os.fspath(self.source_path)]
+        while folders:
+            try:
+                entries = os.scandir(folders.pop())
+            except OSError:
+                # Unreadable folders are skipped, as rglob and os.walk did
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name in exclude:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    elif os.path.splitext(entry.name)[1] in targets:
+                        all_files.append(Path(entry.path))
         return all_files
 
-    @computed_field
-    @cached_property
-    def source_files(self) -> list[Path]:
-        """Computed property that returns the source path as a Path object.
+    def _get_all_files_with_fd(self, suffix: str, exclude: frozenset[str]) -> list[Path] | None:
+        fd = shutil.which("fd") or shutil.which("fdfind")
+        if fd is None:
+            console.log("[yellow]fd is not installed, falling back to the python walker")
+            return None
+        # fd skips hidden folders by default, the python walker does not
+        command = [fd, "--type", "f", "--hidden", "--print0"]
+        for target in suffix.split(","):
+            command.extend(["--extension", target.strip()])
+        for name in sorted(exclude):
+            command.extend(["--exclude", name])
+        command.extend([".", os.fspath(self.source_path)])
+        try:
+            output = subprocess.run(command, capture_output=True, check=True).stdout  # noqa: S603
+        except (subprocess.CalledProcessError, OSError) as e:
+            console.log(f"[yellow]fd failed ({e!s}), falling back to the python walker")
+            return None
+        return [Path(os.fsdecode(path)) for path in output.split(b"\0") if path]
+
+    def _source_files(self) -> list[Path]:
+        """Resolve the files to document, computed once per instance.
 
         Returns:
-            Path: The source path.
+            list[Path]: The python and notebook files found in the source path.
         """
+        if self._source_files_cache is not None:
+            return self._source_files_cache
         if self.source_path.is_dir():
             if self.output_path.exists():
-                shutil.rmtree(self.output_path.absolute())
-            exclude_list = [ex.strip() for ex in self.exclude.split(",")]
-            need_to_exclude = list({*exclude_list, ".venv", "__init__.py"})
-            all_files = self._get_all_files(suffix="py,ipynb")
-            all_files = [
-                file for file in all_files if not any(f in file.parts for f in need_to_exclude)
-            ]
+                _parallel_rmtree(self.output_path.absolute())
+            exclude_list = frozenset(ex.strip() for ex in self.exclude.split(",") if ex.strip())
+            need_to_exclude = exclude_list | {".venv", "__init__.py"}
+            all_files = None
+            if self.use_fd:
+                all_files = self._get_all_files_with_fd(suffix="py,ipynb", exclude=need_to_exclude)
+            if all_files is None:
+                all_files = self._get_all_files(suffix="py,ipynb", exclude=need_to_exclude)
         elif self.source_path.is_file():
             all_files = [self.source_path]
         else:
             raise ValueError("Invalid source path")
+        self._source_files_cache = all_files
         return all_files
 
-    async def _prepare_docs_path(self, file: Path) -> Path:
-        # 因為多層結構的資料夾 我們希望他可以依然放在對應的資料夾內
-        filename = file.with_suffix(".md").name
-        if file.parent.as_posix() != ".":
-            related_path = file.parent.relative_to(self.source_path)
-            docs_path = Path(f"{self.output_path}/{related_path}/{filename}")
-        else:
-            docs_path = Path(f"{self.output_path}/{filename}")
-        docs_path.parent.mkdir(parents=True, exist_ok=True)
-        docs_path.unlink(missing_ok=True)
-        return docs_path
-
-    async def _gen_python_docs(self, file: Path) -> str:
-        docs_path = await self._prepare_docs_path(file=file)
-        if self.mode == "file":
-            note_content = f"::: {file.with_suffix('').as_posix().replace('/', '.')}\n"
-        elif self.mode == "class":
-            async with await anyio.open_file(file, encoding="utf-8") as f:
-                contents = await f.read()
-                tree = ast.parse(source=contents, filename=file)
-
-            note_content = ""
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    note_content += (
-                        f"::: {file.with_suffix('').as_posix().replace('/', '.')}.{node.name}\n"
-                    )
+    def _plan(self) -> dict[Path, Path]:
+        """Map every source file to the markdown file generated for it.
+
+        Returns:
+            dict[Path, Path]: The docs path keyed by its source file.
+        """
+        src = self.source_path
+        out = self.output_path
+        plan: dict[Path, Path] = {}
+        for file in self._source_files():
+            # 因為多層結構的資料夾 我們希望他可以依然放在對應的資料夾內
+            filename = f"{file.stem}.md"
+            if file.parent.as_posix() != "." and file != src:
+                plan[file] = out / file.parent.relative_to(src) / filename
+            else:
+                plan[file] = out / filename
+        return plan
+
+    def _advance(self, progress: Progress, task: TaskID, description: str) -> None:
+        """Advance the progress bar, only rewriting its description every few files."""
+        self._processed += 1
+        if self._processed % 16 == 0:
+            progress.update(task, advance=1, description=description)
         else:
-            raise ValueError("Invalid mode")
+            progress.update(task, advance=1)
+
+    async def _gen_python_docs(self, file: Path, docs_path: Path) -> str:
+        dotted = _module_path(file)
+        contents = await asyncio.to_thread(file.read_bytes)
+        classes = await asyncio.get_running_loop().run_in_executor(
+            self._pool, _extract_classnames, contents, str(file)
+        )
+        note_content = "".join(f"::: {dotted}.{name}\n" for name in classes)
         if not note_content:
-            note_content = f"::: {file.with_suffix('').as_posix().replace('/', '.')}\n"
-        docs_path.write_text(data=note_content, encoding="utf-8")
+            note_content = f"::: {dotted}\n"
+        # Notes are tiny, encoding up front skips the text io layer of write_text
+        await asyncio.to_thread(docs_path.write_bytes, note_content.encode("utf-8"))
         return docs_path.as_posix()
 
-    async def _gen_notebook_docs(self, file: Path) -> str:
-        docs_path = await self._prepare_docs_path(file=file)
-        # 讀取 notebook 檔案
-        async with await anyio.open_file(file, encoding="utf-8") as f:
-            notebook_content = nbformat.reads(await f.read(), as_version=4)
-
-        if self.execute:
-            # 執行 notebook 中的所有 code block
-            execute_preprocessor = ExecutePreprocessor(
-                timeout=600,
-                kernel_name="python3",
-                allow_errors=True,
-                store_widget_state=True,
-                record_timing=True,
-            )
-            if not isinstance(execute_preprocessor, ExecutePreprocessor):
-                raise TypeError("ExecutePreprocessor is not a valid type")
-            execute_preprocessor.preprocess(
-                notebook_content, {"metadata": {"path": file.parent.as_posix()}}
-            )
+    async def _gen_file_note(self, file: Path, docs_path: Path) -> str:
+        """Write the file mode note of a python file, which only needs its module path."""
+        note_content = f"::: {_module_path(file)}\n"
+        await asyncio.to_thread(docs_path.write_bytes, note_content.encode("utf-8"))
+        return docs_path.as_posix()
 
-        # 使用執行後的 notebook 內容轉換為 markdown
-        markdown_exporter = MarkdownExporter(template_name="markdown")
-        if not isinstance(markdown_exporter, MarkdownExporter):
-            raise TypeError("TemplateExporter is not a valid type")
-        markdown_output, _ = markdown_exporter.from_notebook_node(notebook_content)
-        # 寫入轉換後的 markdown 內容到檔案
-        async with await anyio.open_file(docs_path, "w", encoding="utf-8") as f:
-            await f.write(markdown_output)
+    async def _gen_notebook_docs(self, file: Path, docs_path: Path) -> str:
+        # Read, execute, convert and write in one worker job instead of several executor hops
+        await asyncio.get_running_loop().run_in_executor(
+            self._nb_pool, _notebook_pipeline, file, docs_path, self.execute
+        )
         return docs_path.as_posix()
 
-    async def _process_file(self, file: Path, progress: Progress, task: TaskID) -> str:
+    async def _process_file(
+        self, file: Path, docs_path: Path, progress: Progress, task: TaskID
+    ) -> str:
         """Process a single file and update progress."""
         try:
             if file.suffix == ".ipynb":
-                result = await self._gen_notebook_docs(file=file)
+                result = await self._gen_notebook_docs(file=file, docs_path=docs_path)
+            elif file.suffix == ".py" and self.mode == "file":
+                result = await self._gen_file_note(file=file, docs_path=docs_path)
             elif file.suffix == ".py":
-                result = await self._gen_python_docs(file=file)
+                result = await self._gen_python_docs(file=file, docs_path=docs_path)
             else:
                 console.log(f"Unsupported file type: {file.suffix}")
                 result = ""
 
             # Update progress
-            progress.update(task, advance=1, description=f"[cyan]Processed {file.name}")
+            self._advance(progress, task, description=f"[cyan]Processed {file.name}")
             return result
         except Exception as e:
             console.log(f"[red]Error processing {file}: {e!s}")
@@ -211,29 +480,87 @@ class DocsGenerator(BaseModel):
             return ""
 
     async def _process_batch(
-        self, files: list[Path], progress: Progress, task: TaskID
+        self,
+        plan: dict[Path, Path],
+        progress: Progress,
+        task: TaskID,
+        semaphore: asyncio.Semaphore,
     ) -> list[str]:
         """Process a batch of files concurrently with semaphore to control concurrency."""
-        semaphore = asyncio.Semaphore(self.concurrency)
 
-        async def process_with_semaphore(file: Path) -> str:
+        async def process_with_semaphore(file: Path, docs_path: Path) -> str:
             async with semaphore:
-                return await self._process_file(file, progress, task)
+                return await self._process_file(file, docs_path, progress, task)
 
-        tasks = [process_with_semaphore(file) for file in files]
+        tasks = [process_with_semaphore(file, docs_path) for file, docs_path in plan.items()]
         return await asyncio.gather(*tasks)
 
+    def _resolve_concurrency(self, plan: dict[Path, Path]) -> None:
+        """Fill in the default concurrency and keep it below the open file limit."""
+        # Notebooks mostly wait on kernels and can oversubscribe more than parsing
+        if "concurrency" not in self.model_fields_set:
+            has_notebooks = any(file.suffix == ".ipynb" for file in plan)
+            self.concurrency = min(32, _available_cpus() * (4 if has_notebooks else 2))
+        # nbconvert opens several handles per notebook, keep well below the FD limit
+        try:
+            import resource
+
+            soft_nofile, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        except ImportError:
+            soft_nofile = 512
+        effective = max(1, min(self.concurrency, soft_nofile // 4))
+        if effective < self.concurrency:
+            console.log(
+                f"[yellow]Concurrency clamped from {self.concurrency} to {effective} "
+                f"(open file limit: {soft_nofile})"
+            )
+            self.concurrency = effective
+
     async def gen_docs(self) -> None:
-        with Progress() as progress:
-            total_files = len(self.source_files)
+        self._processed = 0
+        with Progress(refresh_per_second=10) as progress:
+            plan = self._plan()
+            total_files = len(plan)
             task = progress.add_task(f"[green]Generating {total_files}...", total=total_files)
 
-            if not self.source_files:
+            if not plan:
                 console.log("[yellow]No files found to process")
                 return
 
-            # Process all files concurrently with controlled concurrency
-            results = await self._process_batch(self.source_files, progress, task)
+            # Create every output folder once instead of once per file
+            docs_dirs = {docs_path.parent for docs_path in plan.values()}
+            for docs_dir in sorted(docs_dirs, key=lambda p: len(p.parts)):
+                docs_dir.mkdir(parents=True, exist_ok=True)
+            # Writing truncates an existing file, only a symlink must be removed so the
+            # markdown is not written through it into another location
+            if self.source_path in plan and plan[self.source_path].is_symlink():
+                plan[self.source_path].unlink()
+
+            self._resolve_concurrency(plan=plan)
+
+            # Parsing is CPU bound, spread it across cores instead of the event loop thread,
+            # small trees parse on the default executor as the pool startup would dominate
+            python_files = [file for file in plan if file.suffix == ".py"]
+            if self.mode == "class" and _use_process_pool(python_files):
+                # Workers are spawned on every platform, forking now would copy a process
+                # that already runs the progress refresh thread
+                self._pool = ProcessPoolExecutor(
+                    max_workers=_available_cpus(), mp_context=multiprocessing.get_context("spawn")
+                )
+            # Notebook conversion is blocking, kernels already run in their own processes so
+            # threads are enough to wait on them
+            self._nb_pool = ThreadPoolExecutor(max_workers=self.concurrency)
+            try:
+                # Process all files concurrently, every path shares one FD-clamped limit
+                semaphore = asyncio.Semaphore(self.concurrency)
+                results = await self._process_batch(plan, progress, task, semaphore)
+            finally:
+                if self._pool is not None:
+                    self._pool.shutdown()
+                    self._pool = None
+                if self._nb_pool is not None:
+                    self._nb_pool.shutdown()
+                    self._nb_pool = None
 
             # Summarize results
             successful = len([r for r in results if r])
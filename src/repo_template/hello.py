@@ -2,13 +2,15 @@ from pydantic import Field, BaseModel, ConfigDict, AliasChoices
 
 
 class Response(BaseModel):
-    model_config = ConfigDict(use_attribute_docstrings=True)
+    model_config = ConfigDict(
+        use_attribute_docstrings=True, defer_build=True, extra="forbid", frozen=True
+    )
     name: str = Field(
         ...,
         title="Name",
         description="The name of the response.",
         validation_alias=AliasChoices("name", "Name"),
-        frozen=False,
+        frozen=True,
         deprecated=False,
     )
     content: str = Field(
@@ -16,36 +18,36 @@ class Response(BaseModel):
         title="Content",
         description="The content of the response.",
         validation_alias=AliasChoices("content", "Content"),
-        frozen=False,
+        frozen=True,
         deprecated=False,
     )
 
 
+# The greeting is a trusted constant, so it skips validation; use `Response(...)` or
+# `Response.model_validate` for anything coming from outside.
+_HELLO_RESPONSE = Response.model_construct(name="Wei", content="Hello, World!")
+
+
 def hello_fn() -> Response:
     """Generates a greeting response.
 
-    This function creates a Response object with a predefined name and content.
+    This function returns a Response object with a predefined name and content.
     The name is set to "Wei" and the content is set to "Hello, World!".
+    Every call returns the same frozen instance, which is built once without validation.
 
     Returns:
         Response: An object containing the name and content.
     """
-    name = "Wei"
-    content = "Hello, World!"
-    template_model = Response(name=name, content=content)
-    return template_model
+    return _HELLO_RESPONSE
 
 
 async def a_hello_fn() -> Response:
-    """Asynchronous function that creates a Response object with a greeting message.
+    """Asynchronous function that returns a Response object with a greeting message.
 
     Returns:
         Response: An object containing the name and greeting message.
     """
-    name = "Wei"
-    content = "Hello, World!"
-    template_model = Response(name=name, content=content)
-    return template_model
+    return _HELLO_RESPONSE
 
 
 if __name__ == "__main__":
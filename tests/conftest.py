@@ -0,0 +1,7 @@
+import pytest
+from src.repo_template.hello import Response
+
+
+@pytest.fixture(scope="session")
+def expected_response() -> Response:
+    return Response(name="Wei", content="Hello, World!")
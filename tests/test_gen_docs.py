@@ -0,0 +1,307 @@
+import os
+from typing import Any, Literal
+from pathlib import Path
+import subprocess
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from pydantic import ValidationError
+
+pytest.importorskip("nbconvert")
+pytest.importorskip("rich")
+
+import nbformat
+import scripts.gen_docs
+from scripts.gen_docs import (
+    DocsGenerator,
+    _module_path,
+    _parallel_rmtree,
+    _notebook_pipeline,
+    _extract_classnames,
+)
+
+
+@pytest.fixture
+def fd_package(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> DocsGenerator:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pkg" / ".venv").mkdir(parents=True)
+    (tmp_path / "pkg" / "a.py").write_text("class Foo: ...\n")
+    (tmp_path / "pkg" / "b.py").write_text("class Bar: ...\n")
+    (tmp_path / "pkg" / ".venv" / "v.py").write_text("class V: ...\n")
+    monkeypatch.setattr("scripts.gen_docs.shutil.which", lambda name: f"/usr/bin/{name}")
+    return DocsGenerator(source=Path("pkg"), output=Path("out"), use_fd=True)
+
+
+def _classnames(source: str) -> list[str]:
+    return _extract_classnames(source.encode("utf-8"), "module.py")
+
+
+def test_extract_classnames_skips_private_and_nested():
+    source = (
+        "class Foo:\n"
+        "    class Inner: ...\n"
+        "class _Private: ...\n"
+        "def build():\n"
+        "    class Local: ...\n"
+        "class Bar: ...\n"
+    )
+    assert _classnames(source) == ["Foo", "Bar"]
+
+
+@pytest.mark.parametrize(
+    ("dunder_all", "expected"),
+    [
+        ('__all__ = ["A"]', ["A"]),
+        ('__all__ = ("A", "C")', ["A", "C"]),
+        ('__all__: list[str] = ["C"]', ["C"]),
+        ("__all__ = None", ["A", "B", "C"]),
+        ('__all__ = "A"', ["A", "B", "C"]),
+        ("__all__ = [name for name in dir()]", ["A", "B", "C"]),
+        ('__all__ = ["A"]\n__all__ += ["B"]', ["A", "B", "C"]),
+        ('__all__ = ["A"]\n__all__.extend(["B"])', ["A", "B", "C"]),
+        ('__all__ = ["A"]\n__all__.append("B")', ["A", "B", "C"]),
+    ],
+)
+def test_extract_classnames_respects_literal_all(dunder_all: str, expected: list[str]):
+    source = f"{dunder_all}\nclass A: ...\nclass B: ...\nclass C: ...\n"
+    assert _classnames(source) == expected
+
+
+@pytest.mark.asyncio
+async def test_gen_docs_class_mode(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    package = tmp_path / "pkg"
+    (package / "sub").mkdir(parents=True)
+    (package / "__init__.py").write_text("")
+    (package / "a.py").write_text("class Foo: ...\nclass _Hidden: ...\n")
+    (package / "sub" / "b.py").write_text("__all__ = None\nclass Bar: ...\n")
+    (package / "sub" / "c.py").write_text("value = 1\n")
+
+    await DocsGenerator(source=Path("pkg"), output=Path("out"), mode="class").gen_docs()
+
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a.Foo\n"
+    assert (tmp_path / "out" / "sub" / "b.md").read_text() == "::: pkg.sub.b.Bar\n"
+    assert (tmp_path / "out" / "sub" / "c.md").read_text() == "::: pkg.sub.c\n"
+    assert not (tmp_path / "out" / "__init__.md").exists()
+
+
+@pytest.mark.asyncio
+async def test_gen_docs_file_mode(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / "a.py").write_text("class Foo: ...\nclass Bar: ...\n")
+    (tmp_path / "pkg" / "sub" / "b.py").write_text("value = 1\n")
+
+    await DocsGenerator(source=Path("pkg"), output=Path("out"), mode="file").gen_docs()
+
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a\n"
+    assert (tmp_path / "out" / "sub" / "b.md").read_text() == "::: pkg.sub.b\n"
+
+
+@pytest.mark.parametrize(
+    ("mode", "expected"), [("class", "::: pkg.a.Foo\n"), ("file", "::: pkg.a\n")]
+)
+@pytest.mark.asyncio
+async def test_gen_docs_single_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, mode: Literal["file", "class"], expected: str
+):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("class Foo: ...\n")
+    outside = tmp_path / "outside.md"
+    outside.write_text("keep")
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a.md").symlink_to(outside)
+
+    await DocsGenerator(source=Path("pkg/a.py"), output=Path("out"), mode=mode).gen_docs()
+
+    # The note replaces the symlink instead of being written through it
+    assert not (tmp_path / "out" / "a.md").is_symlink()
+    assert (tmp_path / "out" / "a.md").read_text() == expected
+    assert outside.read_text() == "keep"
+
+
+@pytest.mark.asyncio
+async def test_gen_docs_with_fd(
+    tmp_path: Path, fd_package: DocsGenerator, monkeypatch: pytest.MonkeyPatch
+):
+    calls: list[list[str]] = []
+
+    def fake_run(command: list[str], **kwargs: object) -> subprocess.CompletedProcess:
+        calls.append(command)
+        return subprocess.CompletedProcess(command, 0, stdout=b"pkg/a.py\0")
+
+    monkeypatch.setattr("scripts.gen_docs.subprocess.run", fake_run)
+    await fd_package.gen_docs()
+
+    assert calls[0][0] == "/usr/bin/fd"
+    assert "--hidden" in calls[0]
+    assert calls[0][-2:] == [".", "pkg"]
+    assert calls[0][calls[0].index(".venv") - 1] == "--exclude"
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a.Foo\n"
+    # Only the files listed by fd are documented
+    assert not (tmp_path / "out" / "b.md").exists()
+
+
+@pytest.mark.parametrize(
+    "error", [subprocess.CalledProcessError(returncode=2, cmd="fd"), FileNotFoundError("fd")]
+)
+@pytest.mark.asyncio
+async def test_gen_docs_falls_back_when_fd_fails(
+    tmp_path: Path, fd_package: DocsGenerator, monkeypatch: pytest.MonkeyPatch, error: Exception
+):
+    def failing_run(command: list[str], **kwargs: object) -> subprocess.CompletedProcess:
+        raise error
+
+    monkeypatch.setattr("scripts.gen_docs.subprocess.run", failing_run)
+    await fd_package.gen_docs()
+
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a.Foo\n"
+    assert (tmp_path / "out" / "b.md").read_text() == "::: pkg.b.Bar\n"
+    assert not (tmp_path / "out" / ".venv").exists()
+
+
+@pytest.mark.asyncio
+async def test_gen_docs_falls_back_without_fd(
+    tmp_path: Path, fd_package: DocsGenerator, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr("scripts.gen_docs.shutil.which", lambda name: None)
+    await fd_package.gen_docs()
+
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a.Foo\n"
+    assert (tmp_path / "out" / "b.md").read_text() == "::: pkg.b.Bar\n"
+
+
+@pytest.mark.asyncio
+async def test_gen_docs_skips_unreadable_folders(
+    tmp_path: Path, fd_package: DocsGenerator, monkeypatch: pytest.MonkeyPatch
+):
+    (tmp_path / "pkg" / "locked").mkdir()
+    (tmp_path / "pkg" / "locked" / "c.py").write_text("class Baz: ...\n")
+    scandir = os.scandir
+
+    def guarded_scandir(path: str) -> Iterator[os.DirEntry[str]]:
+        if Path(path).name == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr("scripts.gen_docs.os.scandir", guarded_scandir)
+    monkeypatch.setattr("scripts.gen_docs.shutil.which", lambda name: None)
+    await fd_package.gen_docs()
+
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a.Foo\n"
+    assert not (tmp_path / "out" / "locked").exists()
+
+
+@pytest.mark.parametrize(("cpus", "pools"), [(1, 0), (2, 1)])
+@pytest.mark.asyncio
+async def test_gen_docs_process_pool(
+    tmp_path: Path,
+    fd_package: DocsGenerator,
+    monkeypatch: pytest.MonkeyPatch,
+    cpus: int,
+    pools: int,
+):
+    created: list[ProcessPoolExecutor] = []
+
+    class RecordingPool(ProcessPoolExecutor):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(scripts.gen_docs, "_MIN_FILES_FOR_POOL", 1)
+    monkeypatch.setattr(scripts.gen_docs, "_MIN_BYTES_FOR_POOL", 0)
+    monkeypatch.setattr(scripts.gen_docs, "_available_cpus", lambda: cpus)
+    monkeypatch.setattr(scripts.gen_docs, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr("scripts.gen_docs.shutil.which", lambda name: None)
+    await fd_package.gen_docs()
+
+    # A single CPU would only add startup overhead
+    assert len(created) == pools
+    assert (tmp_path / "out" / "a.md").read_text() == "::: pkg.a.Foo\n"
+    assert (tmp_path / "out" / "b.md").read_text() == "::: pkg.b.Bar\n"
+
+
+def test_concurrency_must_be_positive():
+    with pytest.raises(ValidationError, match="concurrency"):
+        DocsGenerator(source=Path("pkg"), output=Path("out"), concurrency=0)
+
+
+@pytest.mark.parametrize(
+    ("file", "expected"),
+    [
+        (Path("src/pkg/a.py"), "src.pkg.a"),
+        (Path("a.py"), "a"),
+        (Path("/srv/x/pkg/a.py"), "srv.x.pkg.a"),
+    ],
+)
+def test_module_path(file: Path, expected: str):
+    assert _module_path(file) == expected
+
+
+def test_notebook_orjson_and_nbformat_match(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("orjson")
+    notebook = tmp_path / "demo.ipynb"
+    nbformat.write(
+        nbformat.v4.new_notebook(
+            cells=[
+                nbformat.v4.new_markdown_cell("# Demo"),
+                nbformat.v4.new_code_cell(
+                    "print('hello')",
+                    outputs=[nbformat.v4.new_output("stream", name="stdout", text="hello\n")],
+                ),
+            ]
+        ),
+        notebook,
+    )
+    reads = nbformat.reads
+    fallbacks: list[bool] = []
+
+    def recording_reads(*args: Any, **kwargs: Any) -> nbformat.NotebookNode:
+        fallbacks.append(True)
+        return reads(*args, **kwargs)
+
+    monkeypatch.setattr("scripts.gen_docs.nbformat.reads", recording_reads)
+    markdown: dict[bool, str] = {}
+    for has_orjson in (True, False):
+        monkeypatch.setattr(scripts.gen_docs, "_HAS_ORJSON", has_orjson)
+        docs_path = tmp_path / f"orjson_{has_orjson}.md"
+        _notebook_pipeline(notebook, docs_path, execute=False)
+        markdown[has_orjson] = docs_path.read_text()
+
+    # Only the run without orjson goes through nbformat.reads
+    assert fallbacks == [True]
+    assert markdown[True] == markdown[False]
+    assert "# Demo" in markdown[True]
+    assert "hello" in markdown[True]
+
+
+def test_parallel_rmtree(tmp_path: Path):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "keep.md").write_text("keep")
+    root = tmp_path / "out"
+    (root / "sub" / "deep").mkdir(parents=True)
+    (root / "a.md").write_text("a")
+    (root / "sub" / "deep" / "b.md").write_text("b")
+    (root / "sub" / "link").symlink_to(outside)
+
+    _parallel_rmtree(root)
+
+    assert not root.exists()
+    # Links inside the tree are removed, not followed
+    assert (outside / "keep.md").read_text() == "keep"
+
+
+def test_parallel_rmtree_refuses_symlinked_root(tmp_path: Path):
+    real = tmp_path / "real"
+    real.mkdir()
+    (real / "keep.md").write_text("keep")
+    link = tmp_path / "link"
+    link.symlink_to(real, target_is_directory=True)
+
+    with pytest.raises(OSError, match="symbolic link"):
+        _parallel_rmtree(link)
+
+    assert (real / "keep.md").read_text() == "keep"
@@ -1,15 +1,13 @@
 import pytest
-from src.repo_template.hello import hello_fn, a_hello_fn
+from src.repo_template.hello import Response, hello_fn, a_hello_fn
 
 
-def test_hello():
+def test_hello(expected_response: Response):
     hello = hello_fn()
-    assert hello.name == "Wei"
-    assert hello.content == "Hello, World!"
+    assert hello == expected_response
 
 
-@pytest.mark.asyncio
-async def test_a_hello():
+@pytest.mark.asyncio(loop_scope="session")
+async def test_a_hello(expected_response: Response):
     hello = await a_hello_fn()
-    assert hello.name == "Wei"
-    assert hello.content == "Hello, World!"
+    assert hello == expected_response